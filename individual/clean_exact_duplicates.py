@@ -1,38 +1,58 @@
 import pandas as pd
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 CSV_FILE = "duplicate_report.csv"
+# Only the columns we use, with compact dtypes (category compare/group is O(categories))
+REPORT_DTYPES = {"type": "category", "group_id": "category", "file_path": "string"}
 DRY_RUN = False   # ⚠️ IMPORTANT: Set to False to actually delete
 
+def _remove(file_path):
+    try:
+        os.remove(file_path)
+        return True
+    except OSError as e:
+        print(f"Delete failed: {file_path} ({e})")
+        return False
+
+
 def clean_exact_duplicates():
-    df = pd.read_csv(CSV_FILE)
+    df = pd.read_csv(CSV_FILE, usecols=list(REPORT_DTYPES), dtype=REPORT_DTYPES)
 
     # Filter only exact duplicates
     exact_df = df[df["type"] == "exact_duplicate"]
 
-    grouped = exact_df.groupby("group_id")
+    # Keep first file of each group, delete the rest (single vectorized pass)
+    is_extra = exact_df.duplicated("group_id", keep="first")
 
     total_deleted = 0
 
-    for group_id, group in grouped:
-        files = group["file_path"].tolist()
+    print(f"Exact duplicate groups: {(~is_extra).sum()}")
 
-        # Keep first file
-        keep_file = files[0]
-        delete_files = files[1:]
+    for file_path in exact_df.loc[~is_extra, "file_path"]:
+        print(f"Keeping: {file_path}")
 
-        print(f"\nGroup: {group_id}")
-        print(f"Keeping: {keep_file}")
+    # One thread pool for the syscall-bound work: batch-stat every candidate
+    # once, then delete the ones still on disk
+    extras = exact_df.loc[is_extra, "file_path"].tolist()
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        alive = {
+            file_path
+            for file_path, exists in zip(extras, executor.map(os.path.lexists, extras))
+            if exists
+        }
 
-        for file_path in delete_files:
-            if os.path.exists(file_path):
+        to_delete = []
+        for file_path in extras:
+            if file_path in alive:
                 print(f"Deleting: {file_path}")
-                if not DRY_RUN:
-                    os.remove(file_path)
-                    total_deleted += 1
+                to_delete.append(file_path)
             else:
                 print(f"File not found: {file_path}")
 
+        if not DRY_RUN:
+            total_deleted = sum(executor.map(_remove, to_delete))
+
     print("\n=================================")
     if DRY_RUN:
         print("DRY RUN MODE — No files deleted")
@@ -1,27 +1,68 @@
 import os
 import hashlib
-from PIL import Image
-import imagehash
+import io
+import mmap
+import re
+import sqlite3
+import cv2
+from PIL import Image, ExifTags
+import numpy as np
+import scipy.fft
 from tqdm import tqdm
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
 import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+try:
+    import xxhash  # SIMD-accelerated, much faster than MD5
+except ImportError:
+    xxhash = None
+
+try:
+    import pyarrow as pa  # native CSV writer, no DataFrame needed
+    import pyarrow.csv
+except ImportError:
+    pa = None
 
 # ===================================
 # CONFIG
 # ===================================
 IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp')
+_IMG_EXT = frozenset(e.lower() for e in IMAGE_EXTENSIONS)  # O(1) lookup
 SIMILARITY_THRESHOLD = 5  # lower = stricter similarity
 OUTPUT_CSV = "duplicate_report.csv"
+MMAP_THRESHOLD = 4 << 20  # hash files above 4 MiB via mmap
+FUSED_READ_LIMIT = 32 << 20  # read files up to 32 MiB once for both hashes
+PHASH_BATCH_SIZE = 4096  # thumbnails per vectorized pHash DCT call
+HASH_CACHE = "hash_cache.sqlite"  # hashes reused across runs
+_EXIF_EXT = frozenset((".jpg", ".jpeg", ".tif", ".tiff", ".heic"))  # others skip EXIF
+_DATE_RE = re.compile(r'(\d{4})(\d{2})(\d{2})')  # YYYYMMDD in filename
 
 # ===================================
 # FILE HASH (Exact Duplicate)
 # ===================================
-def get_file_hash(filepath, chunk_size=8192):
-    hasher = hashlib.md5()
+FILE_HASH_ALGO = "xxh3_128" if xxhash else "md5"  # stored with each cached digest
+
+
+def new_file_hasher():
+    # No cryptographic requirement here, so prefer the faster xxh3-128
+    return xxhash.xxh3_128() if xxhash else hashlib.md5()
+
+
+def get_file_hash(filepath, chunk_size=1 << 20):
+    hasher = new_file_hasher()
     try:
         with open(filepath, 'rb') as f:
-            while chunk := f.read(chunk_size):
-                hasher.update(chunk)
+            if os.fstat(f.fileno()).st_size > MMAP_THRESHOLD:
+                # Hand the whole mapped file to the hasher in a single call
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    hasher.update(mm)
+            else:
+                while chunk := f.read(chunk_size):
+                    hasher.update(chunk)
         return hasher.hexdigest()
     except:
         return None
@@ -29,23 +70,295 @@ def get_file_hash(filepath, chunk_size=8192):
 # ===================================
 # PERCEPTUAL HASH (Visual Duplicate)
 # ===================================
-def get_phash(filepath):
+def load_phash_thumbnail(data, size=32):
     try:
-        with Image.open(filepath) as img:
-            return imagehash.phash(img)
+        # Grayscale decode + resize in OpenCV
+        gray = cv2.imdecode(
+            np.frombuffer(data, dtype=np.uint8),
+            cv2.IMREAD_GRAYSCALE
+        )
+        if gray is None:
+            # OpenCV can't decode GIF etc. -> PIL
+            with Image.open(io.BytesIO(data)) as img:
+                gray = np.asarray(img.convert("L"))
+
+        return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+    except:
+        return None
+
+
+def load_phash_thumbnail_from_path(path, size=32):
+    # Very large files: decode from disk at 1/8 scale instead of
+    # reading the whole file into memory first
+    try:
+        gray = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if gray is None:
+            # OpenCV can't decode it -> PIL, with JPEG draft scaling
+            with Image.open(path) as img:
+                img.draft("L", (size, size))
+                gray = np.asarray(img.convert("L"))
+
+        return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
     except:
         return None
 
+
+def phash_batch(thumbnails, hash_size=8):
+    # One float32 DCT call for a whole (B, 32, 32) stack of thumbnails;
+    # only the sign against the median matters, so float64 buys nothing
+    dct = scipy.fft.dctn(
+        thumbnails.astype(np.float32),
+        axes=(1, 2),
+        workers=-1,
+        overwrite_x=True
+    )
+    low_freq = dct[:, :hash_size, :hash_size].reshape(len(thumbnails), -1)
+    bits = low_freq > np.median(low_freq, axis=1, keepdims=True)
+
+    # 64 bits -> uint64, same bit order as imagehash's hex string
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def get_phash_from_bytes(data):
+    thumbnail = load_phash_thumbnail(data)
+    if thumbnail is None:
+        return None
+    return int(phash_batch(thumbnail[None])[0])
+
+
+def get_phash(filepath):
+    try:
+        with open(filepath, 'rb') as f:
+            return get_phash_from_bytes(f.read())
+    except OSError:
+        return None
+
+# ===================================
+# HASH ONE IMAGE (Worker)
+# ===================================
+def _hash_one(path, want_hash=True):
+    # Returns the pHash thumbnail; the DCT runs batched in analyze()
+    # want_hash=False: size is unique in the scan → no exact hash needed
+    try:
+        with open(path, 'rb') as f:
+            # Very large files: stream the exact hash and decode the
+            # thumbnail from the path, so the file is never held in RAM
+            if os.fstat(f.fileno()).st_size > FUSED_READ_LIMIT:
+                file_hash = get_file_hash(path) if want_hash else None
+                return path, file_hash, load_phash_thumbnail_from_path(path)
+
+            # Otherwise read once and feed both hashes from the same bytes
+            data = f.read()
+    except OSError:
+        return path, None, None
+
+    if not want_hash:
+        return path, None, load_phash_thumbnail(data)
+
+    hasher = new_file_hasher()
+    hasher.update(data)
+    return path, hasher.hexdigest(), load_phash_thumbnail(data)
+
+# ===================================
+# HASH CACHE (path, size, mtime -> hashes)
+# ===================================
+def open_hash_cache(cache_path=HASH_CACHE):
+    conn = sqlite3.connect(cache_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS hashes ("
+        "path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, "
+        "file_hash TEXT, phash INTEGER, hash_algo TEXT)"
+    )
+
+    # Caches written before hash_algo existed: their digests count as stale
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(hashes)")}
+    if "hash_algo" not in columns:
+        conn.execute("ALTER TABLE hashes ADD COLUMN hash_algo TEXT")
+    return conn
+
+
+def _phash_to_db(phash):
+    # SQLite integers are signed 64-bit -> store the same bit pattern
+    if phash is None:
+        return None
+    return phash - (1 << 64) if phash >= 1 << 63 else phash
+
 # ===================================
 # SCAN IMAGES
 # ===================================
 def scan_images(folder):
-    images = []
-    for root, _, files in os.walk(folder):
-        for file in files:
-            if file.lower().endswith(IMAGE_EXTENSIONS):
-                images.append(os.path.join(root, file))
-    return images
+    # Lazy recursive scandir walk (DirEntry caches the file type)
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from scan_images(entry.path)
+
+                elif entry.is_file() and \
+                        os.path.splitext(entry.name)[1].lower() in _IMG_EXT:
+                    yield entry.path
+    except OSError:
+        pass  # unreadable folder -> skip, like os.walk
+
+# ===================================
+# HAMMING DISTANCE (Vectorized)
+# ===================================
+def popcount64(values):
+    # NumPy >= 2.0: hardware popcount ufunc
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+
+    # Older NumPy: SWAR bit count over a uint64 array
+    x = values - ((values >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+def _component_roots(n, rows, cols):
+    # Label each node with the lowest node index in its component
+    adjacency = csr_matrix(
+        (np.ones(len(rows), dtype=np.int8), (rows, cols)),
+        shape=(n, n)
+    )
+    _, labels = connected_components(adjacency, directed=False)
+    _, first = np.unique(labels, return_index=True)
+    return first[labels]
+
+
+def _near_pairs(members, hashes, threshold):
+    # Spanning forest over the pairs of `members` within `threshold` bits.
+    # Each row block is folded in before the next one, so memory stays
+    # linear even when every member is near every other one.
+    k = len(members)
+    sub = hashes[members]
+    rows_per_block = max(1, 4_000_000 // k)
+    roots = np.arange(k)
+
+    for start in range(0, k, rows_per_block):
+        dist = popcount64(sub[start:start + rows_per_block, None] ^ sub[None, :])
+
+        i, j = np.nonzero(dist <= threshold)
+        i += start
+        new = roots[i] != roots[j]  # already connected -> nothing to add
+        if new.any():
+            roots = _component_roots(
+                k, np.r_[np.arange(k), i[new]], np.r_[roots, j[new]]
+            )
+
+    linked = np.flatnonzero(roots != np.arange(k))
+    return members[linked], members[roots[linked]]
+
+
+def find_similar_groups(files, hashes, threshold=SIMILARITY_THRESHOLD):
+    n = len(files)
+    if n < 2:
+        return []
+
+    # Identical hashes (blank frames, screenshots, bursts) are one node,
+    # so a big cluster of them is never compared pair by pair
+    unique_hashes, inverse = np.unique(hashes, return_inverse=True)
+    m = len(unique_hashes)
+
+    # Multi-index hashing: split the 64 bits into threshold + 1 ranges.
+    # Any pair within `threshold` bits matches exactly on at least one
+    # range (pigeonhole), so only bucket-mates need comparing.
+    bounds = np.linspace(0, 64, min(threshold, 63) + 2).astype(int)
+    ranges = list(zip(bounds[:-1], bounds[1:])) if m > 1 else []
+    rows = [np.empty(0, dtype=np.intp)]
+    cols = [np.empty(0, dtype=np.intp)]
+
+    for lo, hi in tqdm(ranges, desc="Comparing hashes"):
+        keys = (unique_hashes >> np.uint64(lo)) & np.uint64((1 << (hi - lo)) - 1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], m]
+
+        for start, end in zip(starts, ends):
+            if end - start < 2:
+                continue
+
+            bucket_rows, bucket_cols = _near_pairs(
+                order[start:end], unique_hashes, threshold
+            )
+            rows.append(bucket_rows)
+            cols.append(bucket_cols)
+
+    # Per-bucket forests -> connected components (duplicate edges are harmless)
+    roots = _component_roots(m, np.concatenate(rows), np.concatenate(cols))
+    labels = roots[inverse.ravel()]
+
+    # Renumber components by first file so groups keep scan order
+    _, first, labels = np.unique(labels, return_index=True, return_inverse=True)
+    labels = np.argsort(np.argsort(first))[labels.ravel()]
+
+    # Split file indices by label
+    sizes = np.bincount(labels)
+    members = np.split(
+        np.argsort(labels, kind="stable"), np.cumsum(sizes)[:-1]
+    )
+
+    return [[files[i] for i in group] for group in members if len(group) > 1]
+
+# ===================================
+# REPORT METADATA (visual groups only)
+# best date + sharpness precomputed here so the
+# review GUI needs no per-file EXIF / blur pass
+# ===================================
+def get_best_date(path):
+
+    # 1️⃣ EXIF DateTimeOriginal (JPEG/TIFF/HEIC only)
+    if os.path.splitext(path)[1].lower() in _EXIF_EXT:
+        try:
+            with Image.open(path) as img:
+                exif_ifd = img.getexif().get_ifd(ExifTags.IFD.Exif)
+                value = exif_ifd.get(ExifTags.Base.DateTimeOriginal)
+
+            if value:
+                return datetime.strptime(value, "%Y:%m:%d %H:%M:%S"), "EXIF"
+        except:
+            pass
+
+    # 2️⃣ Filename YYYYMMDD
+    try:
+        match = _DATE_RE.search(os.path.basename(path))
+        if match:
+            year, month, day = match.groups()
+            return datetime(int(year), int(month), int(day)), "FILENAME"
+    except:
+        pass
+
+    # 3️⃣ Oldest filesystem timestamp
+    try:
+        oldest = min(os.path.getctime(path), os.path.getmtime(path))
+        return datetime.fromtimestamp(oldest), "FILESYSTEM"
+    except:
+        return None, "UNKNOWN"
+
+
+def blur_score(image_path):
+    try:
+        # 1/4-scale grayscale decode is plenty for ranking
+        gray = cv2.imdecode(
+            np.fromfile(image_path, dtype=np.uint8),
+            cv2.IMREAD_REDUCED_GRAYSCALE_4
+        )
+        if gray is None:
+            return 0
+        return cv2.Laplacian(gray, cv2.CV_32F).var()
+    except:
+        return 0
+
+
+def report_metadata(path):
+    # -> (best_date, best_date_source, sharpness) CSV values
+    date_obj, source = get_best_date(path)
+    best_date = date_obj.strftime("%Y-%m-%d %H:%M:%S") if date_obj else None
+    return best_date, source, round(float(blur_score(path)), 1)
+
 
 # ===================================
 # MAIN ANALYSIS
@@ -53,74 +366,152 @@ def scan_images(folder):
 def analyze(folder):
 
     print("Scanning images...")
-    image_files = scan_images(folder)
+    image_files = list(scan_images(folder))
     print(f"Total images found: {len(image_files)}")
 
-    exact_hash_map = defaultdict(list)
-    phash_map = {}
+    # ---- STEP 1: Stat + size buckets ----
+    # Files with a unique size can't be exact duplicates → no content hash
+    stats = {}
+    for path in image_files:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
 
-    # ---- STEP 1: Generate hashes ----
-    for path in tqdm(image_files, desc="Hashing images"):
-        file_hash = get_file_hash(path)
-        if file_hash:
-            exact_hash_map[file_hash].append(path)
+        stats[path] = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
 
-        phash = get_phash(path)
-        if phash:
-            phash_map[path] = phash
+    size_counts = Counter(size for _, size, _ in stats.values())
 
-    # ---- STEP 2: Exact duplicates ----
-    exact_duplicates = {
-        h: paths for h, paths in exact_hash_map.items() if len(paths) > 1
+    # ---- Reuse cached hashes of unchanged files ----
+    # (file_hash is NULL for files that were unique-size when cached,
+    # and is read as NULL when another hasher produced it)
+    file_hashes, phashes, to_hash, want_hash = {}, {}, [], []
+    cache = open_hash_cache()
+    cached = {
+        row[0]: row[1:]
+        for row in cache.execute(
+            "SELECT path, size, mtime, "
+            "CASE WHEN hash_algo = ? THEN file_hash END, phash FROM hashes",
+            (FILE_HASH_ALGO,)
+        )
     }
 
-    # ---- STEP 3: Visual duplicates (Optimized) ----
-    print("Analyzing visual similarity...")
-    similar_groups = []
-    visited = set()
-    files = list(phash_map.keys())
+    for path, (key, size, mtime) in stats.items():
+        need_hash = size_counts[size] > 1
 
-    for i in tqdm(range(len(files))):
-        if files[i] in visited:
-            continue
+        entry = cached.get(key)
+        if entry and entry[:2] == (size, mtime) and (entry[2] or not need_hash):
+            file_hashes[path] = entry[2]
+            if entry[3] is not None:
+                phashes[path] = entry[3] & 0xFFFFFFFFFFFFFFFF
+        else:
+            to_hash.append(path)
+            want_hash.append(need_hash)
 
-        group = [files[i]]
-        visited.add(files[i])
+    print(f"Cached: {len(image_files) - len(to_hash)} | To hash: {len(to_hash)}")
 
-        for j in range(i + 1, len(files)):
-            if files[j] in visited:
-                continue
+    # ---- STEP 2: Hash new/changed files (all cores) ----
+    thumb_paths, thumbnails = [], []
+
+    with ProcessPoolExecutor() as executor:
+        results = executor.map(_hash_one, to_hash, want_hash, chunksize=32)
+
+        for path, file_hash, thumbnail in tqdm(
+            results, total=len(to_hash), desc="Hashing images"
+        ):
+            file_hashes[path] = file_hash
+
+            if thumbnail is not None:
+                thumb_paths.append(path)
+                thumbnails.append(thumbnail)
 
-            if phash_map[files[i]] - phash_map[files[j]] <= SIMILARITY_THRESHOLD:
-                group.append(files[j])
-                visited.add(files[j])
+    # pHash DCTs in vectorized batches
+    for start in range(0, len(thumbnails), PHASH_BATCH_SIZE):
+        batch = np.stack(thumbnails[start:start + PHASH_BATCH_SIZE])
+        batch_paths = thumb_paths[start:start + PHASH_BATCH_SIZE]
+        phashes.update(zip(batch_paths, phash_batch(batch).tolist()))
 
-        if len(group) > 1:
-            similar_groups.append(group)
+    # Save new hashes in one transaction
+    with cache:
+        cache.executemany(
+            "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    *stats[path], file_hashes[path],
+                    _phash_to_db(phashes.get(path)), FILE_HASH_ALGO
+                )
+                for path in to_hash
+                if file_hashes[path] or path in phashes
+            ]
+        )
+    cache.close()
 
-    # ---- STEP 4: Prepare CSV report ----
-    rows = []
+    # Rebuild maps in scan order (first file in a group is the one kept)
+    exact_hash_map = defaultdict(list)  # content hash -> paths
+    phash_files = []  # parallel to the packed uint64 pHash array
 
-    # Exact duplicates
+    for path in image_files:
+        if file_hashes.get(path):
+            exact_hash_map[file_hashes[path]].append(path)
+
+        if path in phashes:
+            phash_files.append(path)
+
+    # ---- STEP 3: Exact duplicates ----
+    exact_duplicates = {
+        h: paths for h, paths in exact_hash_map.items() if len(paths) > 1
+    }
+
+    # ---- STEP 4: Visual duplicates (Vectorized) ----
+    print("Analyzing visual similarity...")
+    hashes = np.fromiter(
+        (phashes[path] for path in phash_files),
+        dtype=np.uint64,
+        count=len(phash_files)
+    )
+    similar_groups = find_similar_groups(phash_files, hashes)
+
+    # ---- STEP 5: Date + sharpness for visual-group members ----
+    visual_files = [path for group in similar_groups for path in group]
+    with ThreadPoolExecutor() as executor:
+        metadata = dict(zip(visual_files, executor.map(report_metadata, visual_files)))
+
+    # ---- STEP 6: Write CSV report (columnar) ----
+    types, group_ids, file_paths = [], [], []
+    best_dates, date_sources, sharpness = [], [], []
+
+    # Exact duplicates (no metadata columns)
     for hash_val, files in exact_duplicates.items():
-        for file in files:
-            rows.append({
-                "type": "exact_duplicate",
-                "group_id": hash_val,
-                "file_path": file
-            })
+        types += ["exact_duplicate"] * len(files)
+        group_ids += [hash_val] * len(files)
+        file_paths += files
+        best_dates += [None] * len(files)
+        date_sources += [None] * len(files)
+        sharpness += [None] * len(files)
 
     # Visual duplicates
     for idx, group in enumerate(similar_groups):
-        for file in group:
-            rows.append({
-                "type": "visual_duplicate",
-                "group_id": f"visual_group_{idx}",
-                "file_path": file
-            })
-
-    df = pd.DataFrame(rows)
-    df.to_csv(OUTPUT_CSV, index=False)
+        types += ["visual_duplicate"] * len(group)
+        group_ids += [f"visual_group_{idx}"] * len(group)
+        file_paths += group
+
+        dates, sources, scores = zip(*(metadata[path] for path in group))
+        best_dates += dates
+        date_sources += sources
+        sharpness += scores
+
+    columns = {
+        "type": types,
+        "group_id": group_ids,
+        "file_path": file_paths,
+        "best_date": best_dates,
+        "best_date_source": date_sources,
+        "sharpness": sharpness,
+    }
+    if pa:
+        pa.csv.write_csv(pa.table(columns), OUTPUT_CSV)
+    else:
+        pd.DataFrame(columns).to_csv(OUTPUT_CSV, index=False)
 
     print("\n===================================")
     print(f"Exact duplicate groups: {len(exact_duplicates)}")
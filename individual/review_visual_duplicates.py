@@ -1,20 +1,40 @@
+import hashlib
 import os
+import queue
 import re
 import shutil
+import threading
 import pandas as pd
 import cv2
 import numpy as np
 import tkinter as tk
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from PIL import Image, ImageTk, ExifTags
 from send2trash import send2trash
 
+try:
+    import pyarrow as pa  # multithreaded native CSV parse
+    import pyarrow.compute
+    import pyarrow.csv
+except ImportError:
+    pa = None
+
 # =========================
 # CONFIG
 # =========================
 CSV_FILE = "duplicate_report.csv"
+# Only the columns we use, with compact dtypes (category compare/group is O(categories))
+REPORT_DTYPES = {"type": "category", "group_id": "category", "file_path": "string"}
+# Precomputed by duplicate_detector for visual rows (absent in older reports)
+REPORT_META_DTYPES = {"best_date": "string", "best_date_source": "string", "sharpness": "float64"}
 OUTPUT_BASE = r"D:\Sorted_Images_Videos"
+PREFETCH_GROUPS = 2  # groups decoded ahead while you review
+THUMBNAIL_CACHE_DIR = "thumbnail_cache"  # 600px WebP previews reused across runs
+_EXIF_EXT = frozenset((".jpg", ".jpeg", ".tif", ".tiff", ".heic"))  # others skip EXIF
+_DATE_RE = re.compile(r'(\d{4})(\d{2})(\d{2})')  # YYYYMMDD in filename
 
 # =========================
 # GLOBAL UNDO STACK
@@ -31,25 +51,26 @@ undo_stack = []
 # =========================
 def get_best_date(path):
 
-    # 1️⃣ EXIF
-    try:
-        with Image.open(path) as img:
-            exif = img._getexif()
-            if exif:
-                for tag, value in exif.items():
-                    decoded = ExifTags.TAGS.get(tag, tag)
-                    if decoded == "DateTimeOriginal":
-                        return (
-                            datetime.strptime(value, "%Y:%m:%d %H:%M:%S"),
-                            "EXIF"
-                        )
-    except:
-        pass
+    # 1️⃣ EXIF (JPEG/TIFF/HEIC only; PNG/GIF/BMP/WebP rarely carry it)
+    if os.path.splitext(path)[1].lower() in _EXIF_EXT:
+        try:
+            # DateTimeOriginal straight from the Exif sub-IFD (single tag lookup)
+            with Image.open(path) as img:
+                exif_ifd = img.getexif().get_ifd(ExifTags.IFD.Exif)
+                value = exif_ifd.get(ExifTags.Base.DateTimeOriginal)
+
+            if value:
+                return (
+                    datetime.strptime(value, "%Y:%m:%d %H:%M:%S"),
+                    "EXIF"
+                )
+        except:
+            pass
 
     # 2️⃣ Filename
     try:
         filename = os.path.basename(path)
-        match = re.search(r'(\d{4})(\d{2})(\d{2})', filename)
+        match = _DATE_RE.search(filename)
         if match:
             year, month, day = match.groups()
             return (
@@ -72,12 +93,37 @@ def get_best_date(path):
         return (None, "UNKNOWN")
 
 
+# =========================
+# UNIQUE DESTINATION
+# Remembers the last "_N" suffix per (folder, name) so a
+# folder full of same-named files isn't re-scanned from 1
+# =========================
+_name_counters = {}
+
+
+def _unique_destination(folder, filename):
+    destination = os.path.join(folder, filename)
+    if not os.path.exists(destination):
+        return destination
+
+    name, ext = os.path.splitext(filename)
+    counter = _name_counters.get((folder, filename), 1)
+    while True:
+        destination = os.path.join(folder, f"{name}_{counter}{ext}")
+        if not os.path.exists(destination):
+            break
+        counter += 1
+
+    _name_counters[(folder, filename)] = counter + 1
+    return destination
+
+
 # =========================
 # MOVE FILE
 # =========================
 def move_to_folder(file_path):
 
-    date_obj, source = get_best_date(file_path)
+    date_obj, source = cached_best_date(file_path)
 
     if not date_obj:
         target_folder = os.path.join(OUTPUT_BASE, "Unknown")
@@ -88,14 +134,7 @@ def move_to_folder(file_path):
 
     os.makedirs(target_folder, exist_ok=True)
 
-    filename = os.path.basename(file_path)
-    destination = os.path.join(target_folder, filename)
-
-    counter = 1
-    while os.path.exists(destination):
-        name, ext = os.path.splitext(filename)
-        destination = os.path.join(target_folder, f"{name}_{counter}{ext}")
-        counter += 1
+    destination = _unique_destination(target_folder, os.path.basename(file_path))
 
     try:
         shutil.move(file_path, destination)
@@ -113,33 +152,286 @@ def get_largest_file(files):
     return max(files, key=lambda f: os.path.getsize(f))
 
 
+# =========================
+# SEND TO RECYCLE BIN (one batched call per group)
+# =========================
+def trash_files(files):
+    if not files:
+        return
+
+    try:
+        send2trash(list(files))
+    except Exception as e:
+        print("Send to Recycle Bin failed:", e)
+
+
 # =========================
 # BLUR / SHARPNESS SCORE
+# Same measure as duplicate_detector's report column, so the
+# label reads the same with or without report metadata
 # =========================
 def blur_score(image_path):
     try:
-        img = cv2.imread(image_path)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        return cv2.Laplacian(gray, cv2.CV_64F).var()
+        # 1/4-scale grayscale decode (native in libjpeg) is plenty for ranking
+        gray = cv2.imdecode(
+            np.fromfile(image_path, dtype=np.uint8),
+            cv2.IMREAD_REDUCED_GRAYSCALE_4
+        )
+        if gray is None:
+            return 0
+        return cv2.Laplacian(gray, cv2.CV_32F).var()
     except:
         return 0
 
 
+# =========================
+# CACHED LOOKUPS
+# Keyed by (path, mtime) so an edited file is re-read
+# =========================
+@lru_cache(maxsize=4096)
+def _cached_best_date(path, mtime):
+    return get_best_date(path)
+
+
+def cached_best_date(path):
+    try:
+        return _cached_best_date(path, os.path.getmtime(path))
+    except OSError:
+        return get_best_date(path)
+
+
+# =========================
+# JPEG DECODER CHECK
+# Thumbnail decoding dominates review time; libjpeg-turbo
+# (stock wheels, or pillow-simd) is several times faster
+# =========================
+def check_jpeg_decoder():
+    try:
+        from PIL import features
+        if features.check_feature("libjpeg_turbo"):
+            return True
+    except Exception:
+        pass
+
+    print("⚠️ Pillow is not built with libjpeg-turbo; thumbnails will decode slower.")
+    print("   Install a turbo-linked build, e.g. pip install pillow-simd")
+    return False
+
+
+# =========================
+# THUMBNAIL PREFETCH
+# PIL decode runs in a background thread;
+# ImageTk.PhotoImage stays on the Tk thread
+# =========================
+def _thumb_cache_path(file_path):
+    # Keyed by path + mtime: an edited file gets a new preview
+    key = f"{file_path}|{os.path.getmtime(file_path)}|600"
+    return os.path.join(
+        THUMBNAIL_CACHE_DIR,
+        hashlib.sha1(key.encode()).hexdigest() + ".webp"
+    )
+
+
+def load_thumbnail(file_path):
+    cache_path = _thumb_cache_path(file_path)
+
+    # 1️⃣ Cached preview from an earlier run
+    if os.path.exists(cache_path):
+        try:
+            img = Image.open(cache_path)
+            img.load()
+            return img
+        except Exception:
+            pass
+
+    # 2️⃣ Decode the original
+    # draft() lets libjpeg decode straight at reduced scale, so the full-size
+    # image is never materialized (no img.copy() before thumbnail)
+    with Image.open(file_path) as img:
+        img.draft("RGB", (600, 600))
+        img.thumbnail((600, 600))
+        thumb = img.copy()  # small image; the file handle closes on exit
+
+    try:
+        thumb.save(cache_path, "WEBP", quality=80)
+    except Exception:
+        pass
+
+    return thumb
+
+
+def _decode_thumb(file_path, report_meta=None):
+    # → (thumbnail, sharpness, date, source) off the Tk thread;
+    # a failed decode returns its exception in place of the thumbnail.
+    # Date/sharpness come from the report when it has them; otherwise
+    # sharpness is blur_score, the same measure the report uses.
+    try:
+        thumbnail = load_thumbnail(file_path)
+        if report_meta:
+            return (thumbnail, *report_meta)
+        score = blur_score(file_path)
+    except Exception as e:
+        return e, 0, None, "UNKNOWN"  # reported by the GUI loop
+
+    date_obj, source = cached_best_date(file_path)  # warms the cache move_to_folder uses
+    return thumbnail, score, date_obj, source
+
+
+def _prefetch_groups(groups, out_queue, report_meta):
+    for index, (group_id, files) in enumerate(groups, start=1):
+
+        # Decode the group's thumbnails in parallel (libjpeg releases the GIL)
+        with ThreadPoolExecutor(max_workers=min(8, len(files))) as executor:
+            decoded = list(executor.map(
+                _decode_thumb, files, [report_meta.get(f) for f in files]
+            ))
+
+        out_queue.put((index, group_id, files, decoded))
+
+    out_queue.put(None)  # no more groups
+
+
+# =========================
+# BATCH STAT
+# All report paths stat'ed once on a thread pool
+# (stat releases the GIL) instead of per group;
+# (st_dev, st_ino) also identifies hardlinked copies
+# =========================
+def _inode(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def _inode_batch(paths):
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        return {
+            path: inode
+            for path, inode in zip(paths, executor.map(_inode, paths))
+            if inode is not None
+        }
+
+
+# =========================
+# GROUP SPLIT
+# Stable sort on group codes + boundary slices;
+# avoids building a DataFrame per group
+# =========================
+def _split_groups(group_ids, file_paths):
+    codes, uniques = pd.factorize(np.asarray(group_ids, dtype=object))  # first-appearance order
+    if len(codes) == 0:
+        return []
+
+    order = np.argsort(codes, kind="mergesort")
+    codes = codes[order]
+    paths = np.asarray(file_paths, dtype=object)[order]
+
+    bounds = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1], True])
+
+    return [
+        (uniques[codes[start]], paths[start:end].tolist())
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+# =========================
+# READ REPORT (visual rows only)
+# pyarrow if installed, else pandas
+# =========================
+def read_visual_rows():
+    # Metadata columns come back as None where missing (or for older reports)
+    wanted = ["group_id", "file_path", *REPORT_META_DTYPES]
+
+    if pa is not None:
+        column_types = {c: pa.string() for c in [*REPORT_DTYPES, "best_date", "best_date_source"]}
+        column_types["sharpness"] = pa.float64()
+
+        table = pa.csv.read_csv(
+            CSV_FILE,
+            convert_options=pa.csv.ConvertOptions(
+                include_columns=[*REPORT_DTYPES, *REPORT_META_DTYPES],
+                include_missing_columns=True,
+                column_types=column_types
+            )
+        )
+        table = table.filter(pa.compute.equal(table["type"], "visual_duplicate"))
+        return {c: table[c].to_pylist() for c in wanted}
+
+    df = pd.read_csv(
+        CSV_FILE,
+        usecols=lambda c: c in REPORT_DTYPES or c in REPORT_META_DTYPES,
+        dtype={**REPORT_DTYPES, **REPORT_META_DTYPES}
+    )
+    visual_df = df[df["type"] == "visual_duplicate"]
+
+    rows = {}
+    for c in wanted:
+        if c in visual_df:
+            column = visual_df[c].astype(object)
+            rows[c] = column.where(column.notna(), None).tolist()
+        else:
+            rows[c] = [None] * len(visual_df)
+    return rows
+
+
+def with_copies(files, copies):
+    # The given paths plus the hardlinks that were collapsed into them
+    return [p for f in files for p in (f, *copies.get(f, ()))]
+
+
 # =========================
 # MAIN REVIEW
 # =========================
 def review_visual_duplicates():
 
-    df = pd.read_csv(CSV_FILE)
-    visual_df = df[df["type"] == "visual_duplicate"]
-    grouped = list(visual_df.groupby("group_id"))
+    check_jpeg_decoder()
+    os.makedirs(THUMBNAIL_CACHE_DIR, exist_ok=True)
+
+    rows = read_visual_rows()
+
+    # path → (sharpness, date, source) precomputed by duplicate_detector
+    report_meta = {
+        f: (score, datetime.fromisoformat(date), source)
+        for f, date, source, score in zip(
+            rows["file_path"], rows["best_date"],
+            rows["best_date_source"], rows["sharpness"]
+        )
+        if date and score is not None
+    }
+
+    # Drop missing files once, show hardlinks (same bytes on disk) under
+    # their first path (copies[path] keeps the other links so every action
+    # below still reaches them), then skip groups with nothing to compare
+    inodes = _inode_batch(rows["file_path"])
+    copies = {}
+    grouped = []
+    for group_id, files in _split_groups(rows["group_id"], rows["file_path"]):
+        unique = {}
+        for f in files:
+            if f not in inodes:
+                continue
+
+            kept = unique.setdefault(inodes[f], f)
+            if kept != f:
+                copies.setdefault(kept, []).append(f)
+
+        if len(unique) >= 2:
+            grouped.append((group_id, list(unique.values())))
     total_groups = len(grouped)
 
-    for index, (group_id, group) in enumerate(grouped, start=1):
+    # Decode upcoming groups in the background
+    prefetched = queue.Queue(maxsize=PREFETCH_GROUPS)
+    threading.Thread(
+        target=_prefetch_groups,
+        args=(grouped, prefetched, report_meta),
+        daemon=True
+    ).start()
 
-        files = [f for f in group["file_path"].tolist() if os.path.exists(f)]
-        if len(files) < 2:
-            continue
+    while (item := prefetched.get()) is not None:
+
+        index, group_id, files, decoded = item
 
         selected_action = {"choice": None}
 
@@ -184,15 +476,16 @@ def review_visual_duplicates():
         # =========================
         # LOAD IMAGES
         # =========================
-        for idx, file_path in enumerate(files):
+        for idx, (file_path, (thumbnail, score, date_obj, source)) in enumerate(zip(files, decoded)):
 
-            try:
-                with Image.open(file_path) as img:
-                    img_copy = img.copy()
+            if isinstance(thumbnail, Exception):
+                print("Cannot open:", file_path)
+                continue
 
-                img_copy.thumbnail((600, 600))
-                photo = ImageTk.PhotoImage(img_copy)
+            try:
+                photo = ImageTk.PhotoImage(thumbnail)
                 images.append(photo)
+                decoded[idx] = None  # Tk holds the pixels now
 
                 frame = tk.Frame(scroll_frame, bd=2, relief="groove")
                 frame.grid(row=idx // columns,
@@ -206,8 +499,7 @@ def review_visual_duplicates():
                 tk.Label(frame, text=file_path,
                          wraplength=500).pack()
 
-                # Date + source
-                date_obj, source = get_best_date(file_path)
+                # Date + source (from the prefetch pass; cached for move_to_folder)
                 date_text = date_obj.strftime("%Y-%m-%d") if date_obj else "Unknown"
 
                 tk.Label(frame, text=f"Date: {date_text}",
@@ -216,8 +508,7 @@ def review_visual_duplicates():
                 tk.Label(frame, text=f"Source: {source}",
                          fg="green").pack()
 
-                # Blur score
-                score = blur_score(file_path)
+                # Blur score (from the report, else scored in the prefetch pass)
                 tk.Label(frame,
                          text=f"Sharpness: {int(score)}",
                          fg="purple").pack()
@@ -306,27 +597,29 @@ def review_visual_duplicates():
         # ACTION EXECUTION
         # =========================
         if action_type == "delete_all":
-            for f in files:
-                send2trash(f)
+            to_trash = with_copies(files, copies)
+            trash_files(to_trash)
+            for f in to_trash:
                 print("Sent to Recycle Bin:", f)
 
         elif action_type == "skip":
-            for f in files:
+            for f in with_copies(files, copies):
                 move_to_folder(f)
 
         elif action_type == "keep_best":
             keep_file = get_largest_file(files)
+            # Only the kept path moves; its extra links are duplicates
             if move_to_folder(keep_file):
-                for f in files:
-                    if f != keep_file:
-                        send2trash(f)
+                trash_files(copies.get(keep_file, []) + with_copies(
+                    [f for f in files if f != keep_file], copies
+                ))
 
         elif action_type == "keep_index":
             keep_file = files[value]
             if move_to_folder(keep_file):
-                for idx, f in enumerate(files):
-                    if idx != value:
-                        send2trash(f)
+                trash_files(copies.get(keep_file, []) + with_copies(
+                    [f for idx, f in enumerate(files) if idx != value], copies
+                ))
 
     print("Done reviewing.")
 
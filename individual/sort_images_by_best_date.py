@@ -1,6 +1,9 @@
 import os
 import re
 import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from PIL import Image, ExifTags
 
@@ -15,6 +18,24 @@ OUTPUT_VIDEOS = r"D:\SortedVideos"
 IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".heic", ".bmp", ".tiff", ".webp")
 VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".3gp", ".wmv", ".mts")
 
+# Lowercase suffix sets for O(1) lookups
+_IMG_EXT = frozenset(e.lower() for e in IMAGE_EXTENSIONS)
+_VIDEO_EXT = frozenset(e.lower() for e in VIDEO_EXTENSIONS)
+_EXIF_EXT = frozenset((".jpg", ".jpeg", ".tif", ".tiff", ".heic"))  # formats with EXIF
+
+# Filename date patterns, compiled once
+_IMG_DATE_RE = re.compile(r'IMG[-_]?(\d{4})(\d{2})(\d{2})')   # IMG-YYYYMMDD
+_START_DATE_RE = re.compile(r'^(\d{4})(\d{2})(\d{2})')        # YYYYMMDD at beginning
+
+SORT_WORKERS = (os.cpu_count() or 1) * 2  # EXIF reads + moves are I/O bound
+
+VERBOSE = True          # False → no per-file "Moved →" lines
+LOG_FLUSH_LINES = 1000  # log lines buffered per stdout write
+
+# One lock per target folder: workers share YYYY/MM folders
+_folder_locks = {}
+_folder_locks_guard = threading.Lock()
+
 
 # ==================================================
 # GET VALID DIRECTORY (handles ".", relative paths)
@@ -57,30 +78,30 @@ def get_valid_directory(prompt_text, existing_path=None, must_exist=True):
 # ==================================================
 def get_best_date(path, is_image=True):
 
-    # 1️⃣ Try EXIF (images only)
-    if is_image:
+    # 1️⃣ Try EXIF (JPEG/TIFF/HEIC images only)
+    if is_image and os.path.splitext(path)[1].lower() in _EXIF_EXT:
         try:
+            # DateTimeOriginal straight from the Exif sub-IFD (single tag lookup)
             with Image.open(path) as img:
-                exif = img._getexif()
-                if exif:
-                    for tag, value in exif.items():
-                        decoded = ExifTags.TAGS.get(tag, tag)
-                        if decoded == "DateTimeOriginal":
-                            return (
-                                datetime.strptime(value, "%Y:%m:%d %H:%M:%S"),
-                                "EXIF"
-                            )
+                exif_ifd = img.getexif().get_ifd(ExifTags.IFD.Exif)
+                value = exif_ifd.get(ExifTags.Base.DateTimeOriginal)
+
+            if value:
+                return (
+                    datetime.strptime(value, "%Y:%m:%d %H:%M:%S"),
+                    "EXIF"
+                )
         except:
             pass
 
     filename = os.path.basename(path)
 
     # 2️⃣ Pattern A: IMG-YYYYMMDD
-    match = re.search(r'IMG[-_]?(\d{4})(\d{2})(\d{2})', filename)
+    match = _IMG_DATE_RE.search(filename)
 
     # 3️⃣ Pattern B: YYYYMMDD at beginning
     if not match:
-        match = re.search(r'^(\d{4})(\d{2})(\d{2})', filename)
+        match = _START_DATE_RE.search(filename)
 
     if match:
         try:
@@ -107,9 +128,67 @@ def get_best_date(path, is_image=True):
     return (None, "UNKNOWN")
 
 
+# ==================================================
+# BUFFERED LOG
+# Workers append lines; stdout gets one write per
+# LOG_FLUSH_LINES instead of one print per file
+# ==================================================
+_log_buffer = []
+_log_lock = threading.Lock()
+
+
+def flush_log():
+    with _log_lock:
+        lines = _log_buffer[:]
+        _log_buffer.clear()
+
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+
+
+def log(message):
+    with _log_lock:
+        _log_buffer.append(message)
+        full = len(_log_buffer) >= LOG_FLUSH_LINES
+
+    if full:
+        flush_log()
+
+
+# ==================================================
+# UNIQUE DESTINATION
+# Remembers the last "_N" suffix per (folder, name) so
+# repeated names don't re-stat _1, _2, ... every time
+# (callers hold the folder lock)
+# ==================================================
+_name_counters = {}
+
+
+def _unique_destination(folder, filename):
+    destination = os.path.join(folder, filename)
+    if not os.path.exists(destination):
+        return destination
+
+    name, ext = os.path.splitext(filename)
+    counter = _name_counters.get((folder, filename), 1)
+    while True:
+        destination = os.path.join(folder, f"{name}_{counter}{ext}")
+        if not os.path.exists(destination):
+            break
+        counter += 1
+
+    _name_counters[(folder, filename)] = counter + 1
+    return destination
+
+
 # ==================================================
 # MOVE FILE
 # ==================================================
+def _folder_lock(folder):
+    with _folder_locks_guard:
+        return _folder_locks.setdefault(folder, threading.Lock())
+
+
 def move_to_sorted_folder(file_path, output_base, is_image=True):
 
     date_obj, source = get_best_date(file_path, is_image)
@@ -121,58 +200,89 @@ def move_to_sorted_folder(file_path, output_base, is_image=True):
         month = date_obj.strftime("%m")
         target_folder = os.path.join(output_base, year, month)
 
-    os.makedirs(target_folder, exist_ok=True)
-
     filename = os.path.basename(file_path)
-    destination = os.path.join(target_folder, filename)
 
-    # Handle duplicate names
-    counter = 1
-    while os.path.exists(destination):
-        name, ext = os.path.splitext(filename)
-        destination = os.path.join(target_folder, f"{name}_{counter}{ext}")
-        counter += 1
+    # Name selection + move are atomic per folder so two workers
+    # never pick the same counter suffix
+    with _folder_lock(target_folder):
+        os.makedirs(target_folder, exist_ok=True)
 
-    try:
-        shutil.move(file_path, destination)
-        print(f"Moved → {destination} | Source: {source}")
-    except Exception as e:
-        print(f"Failed to move {file_path}: {e}")
+        # Handle duplicate names
+        destination = _unique_destination(target_folder, filename)
+
+        try:
+            shutil.move(file_path, destination)
+            if VERBOSE:
+                log(f"Moved → {destination} | Source: {source}")
+        except Exception as e:
+            log(f"Failed to move {file_path}: {e}")
 
 
 # ==================================================
-# MAIN SORT FUNCTION (Recursive)
+# MEDIA WALK → (full_path, is_image)
+# os.scandir: DirEntry names/types come from the directory
+# read itself; output folders are pruned without descending
 # ==================================================
-def sort_all_media(source_folder):
+def _iter_media(folder, skip_dirs):
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
 
-    total_images = 0
-    total_videos = 0
+                if entry.is_dir(follow_symlinks=False):
+                    # Prevent sorting inside output folders
+                    if entry.path not in skip_dirs:
+                        yield from _iter_media(entry.path, skip_dirs)
+                    continue
 
-    source_folder = os.path.abspath(source_folder)
-    output_images_abs = os.path.abspath(OUTPUT_IMAGES)
-    output_videos_abs = os.path.abspath(OUTPUT_VIDEOS)
+                ext = os.path.splitext(entry.name)[1].lower()
+
+                if ext in _IMG_EXT:
+                    yield entry.path, True
+
+                elif ext in _VIDEO_EXT:
+                    yield entry.path, False
 
-    for root, dirs, files in os.walk(source_folder, topdown=True):
+    except OSError:
+        pass  # unreadable folder, skipped like os.walk does
 
-        root_abs = os.path.abspath(root)
 
-        # Prevent sorting inside output folders
-        if root_abs.startswith(output_images_abs) or \
-           root_abs.startswith(output_videos_abs):
-            continue
+def _sort_one(full_path, is_image):
+    output_base = OUTPUT_IMAGES if is_image else OUTPUT_VIDEOS
+    move_to_sorted_folder(full_path, output_base, is_image)
+    return is_image
+
+
+# ==================================================
+# MAIN SORT FUNCTION (Recursive, thread pool)
+# ==================================================
+def sort_all_media(source_folder):
 
-        for file in files:
+    total_images = 0
+    total_videos = 0
 
-            full_path = os.path.join(root, file)
-            lower_file = file.lower()
+    source_folder = os.path.abspath(source_folder)
+    skip_dirs = {os.path.abspath(OUTPUT_IMAGES), os.path.abspath(OUTPUT_VIDEOS)}
 
-            if lower_file.endswith(IMAGE_EXTENSIONS):
-                total_images += 1
-                move_to_sorted_folder(full_path, OUTPUT_IMAGES, True)
+    # Source itself inside an output folder → nothing to sort
+    if any(source_folder == d or source_folder.startswith(d + os.sep) for d in skip_dirs):
+        print("Source folder is inside an output folder; nothing to do.")
+        return
 
-            elif lower_file.endswith(VIDEO_EXTENSIONS):
-                total_videos += 1
-                move_to_sorted_folder(full_path, OUTPUT_VIDEOS, False)
+    try:
+        with ThreadPoolExecutor(max_workers=SORT_WORKERS) as executor:
+            futures = [
+                executor.submit(_sort_one, full_path, is_image)
+                for full_path, is_image in _iter_media(source_folder, skip_dirs)
+            ]
+
+            for future in as_completed(futures):
+                if future.result():
+                    total_images += 1
+                else:
+                    total_videos += 1
+    finally:
+        # Print buffered log lines even on an error or Ctrl+C
+        flush_log()
 
     print("\n==============================")
     print(f"Total images processed: {total_images}")
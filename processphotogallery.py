@@ -1,29 +1,72 @@
 import os
+import queue
 import hashlib
+import io
+import mmap
 import re
 import shutil
+import sqlite3
+import sys
+import threading
 import cv2
-import imagehash
+import numpy as np
+import scipy.fft
 from tqdm import tqdm
-from collections import defaultdict
+from collections import Counter, defaultdict
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import pandas as pd
 import tkinter as tk
 from datetime import datetime
 from PIL import Image, ImageTk, ExifTags
 from send2trash import send2trash
 import argparse
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+try:
+    import xxhash  # SIMD-accelerated, much faster than MD5 for exact-duplicate checks
+except ImportError:
+    xxhash = None
+try:
+    import pyarrow as pa  # Native CSV writer/reader, skips building a DataFrame
+    import pyarrow.compute
+    import pyarrow.csv
+except ImportError:
+    pa = None
 
 # =====================================================
 # ================= CONFIGURATION =====================
 # =====================================================
 SIMILARITY_THRESHOLD = 5  # Lower = stricter visual similarity
 DUPLICATE_REPORT = "duplicate_report.csv"
+MMAP_THRESHOLD = 4 << 20   # Files larger than this (bytes) are hashed via mmap
+FUSED_READ_LIMIT = 32 << 20  # Files up to this size are read once for both hashes
+PHASH_BATCH_SIZE = 4096    # Thumbnails per vectorized pHash DCT call
+HASH_CACHE = "hash_cache.sqlite"  # Hashes reused across runs, keyed by (path, size, mtime)
+THUMBNAIL_SIZE = (600, 600)
+THUMBNAIL_CACHE_DIR = "thumbnail_cache"  # Review previews as WebP, keyed by (path, mtime, size)
+PREFETCH_GROUPS = 2        # Review groups decoded ahead in the background
+REPORT_DTYPES = {"type": "category", "group_id": "category", "file_path": "string"}  # Columns read back from the report
+REPORT_META_DTYPES = {"best_date": "string", "best_date_source": "string", "sharpness": "float64"}  # Visual rows only
+VERBOSE = True             # Per-file "Moved →" lines while sorting (--quiet turns them off)
+LOG_FLUSH_LINES = 1000     # Sort log lines buffered per stdout write
 DRY_RUN = False            # ⚠️ Set to True to prevent file deletion
 # Set OUTPUT_SORTED dynamically relative to the script's running directory
 CURRENT_DIR = os.path.abspath(os.getcwd())
 OUTPUT_SORTED = os.path.join(CURRENT_DIR, "Sorted_Images_Videos")
 IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".heic", ".bmp", ".tiff", ".webp", ".gif")
 VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".3gp", ".wmv", ".mts")
+_IMG_EXT = frozenset(e.lower() for e in IMAGE_EXTENSIONS)    # O(1) suffix lookups
+_VIDEO_EXT = frozenset(e.lower() for e in VIDEO_EXTENSIONS)
+_EXIF_EXT = frozenset((".jpg", ".jpeg", ".tif", ".tiff", ".heic"))  # Formats worth an EXIF lookup
+_DATE_RE = re.compile(r'(\d{4})(\d{2})(\d{2})')   # YYYYMMDD anywhere in a filename
+_SORT_DATE_PATTERNS = [re.compile(p) for p in (
+    r'IMG[-_]?(\d{4})(\d{2})(\d{2})',             # IMG-YYYYMMDD or IMG_YYYYMMDD or IMGYYYYMMDD
+    r'VID[-_]?(\d{4})(\d{2})(\d{2})',             # VID-YYYYMMDD, VID_YYYYMMDD, VIDYYYYMMDD
+    r'SAVE[-_]?(\d{4})(\d{2})(\d{2})',            # SAVE_YYYYMMDD
+    r'Screenshot[-_]?(\d{4})[-_](\d{2})[-_](\d{2})',  # Screenshot_YYYY-MM-DD or -YYYY-MM-DD-
+    r'(\d{4})(\d{2})(\d{2})',                      # YYYYMMDD at beginning
+)]
 
 # ================= GLOBALS ===========================
 undo_stack = []
@@ -32,52 +75,224 @@ undo_stack = []
 # ==================== UTILITY FUNCTIONS =============
 # =====================================================
 
-def get_file_hash(filepath, chunk_size=8192):
+FILE_HASH_ALGO = "xxh3_128" if xxhash else "md5"  # Recorded with cached digests so they never mix
+
+def new_file_hasher():
+    """Return the exact-duplicate hasher (xxh3-128, or MD5 without xxhash)"""
+    return xxhash.xxh3_128() if xxhash else hashlib.md5()
+
+def get_file_hash(filepath, chunk_size=1 << 20):
     """Compute exact file hash for duplicates"""
-    hasher = hashlib.md5()
+    hasher = new_file_hasher()
     try:
         with open(filepath, 'rb') as f:
-            while chunk := f.read(chunk_size):
-                hasher.update(chunk)
+            if os.fstat(f.fileno()).st_size > MMAP_THRESHOLD:
+                # Hand the whole mapped file to the hasher in a single call
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    hasher.update(mm)
+            else:
+                while chunk := f.read(chunk_size):
+                    hasher.update(chunk)
         return hasher.hexdigest()
     except:
         return None
 
+def load_phash_thumbnail(data, size=32):
+    """Decode image bytes to the size x size grayscale thumbnail pHash works on"""
+    try:
+        gray = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            # Formats OpenCV can't decode (GIF, HEIC, ...) go through PIL
+            with Image.open(io.BytesIO(data)) as img:
+                gray = np.asarray(img.convert("L"))
+        return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+    except:
+        return None
+
+def load_phash_thumbnail_from_path(path, size=32):
+    """Like load_phash_thumbnail, but decodes straight from disk at 1/8 scale for very large files"""
+    try:
+        gray = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if gray is None:
+            with Image.open(path) as img:
+                img.draft("L", (size, size))  # JPEG DCT scaling; a no-op for other formats
+                gray = np.asarray(img.convert("L"))
+        return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+    except:
+        return None
+
+def phash_batch(thumbnails, hash_size=8):
+    """Perceptual hashes for a (B, 32, 32) stack of thumbnails as a uint64 array.
+
+    The DCT for the whole batch is a single scipy.fft.dctn call in float32
+    (only the sign against the median matters, so float64 buys nothing).
+    """
+    dct = scipy.fft.dctn(thumbnails.astype(np.float32), axes=(1, 2), workers=-1, overwrite_x=True)
+    low_freq = dct[:, :hash_size, :hash_size].reshape(len(thumbnails), -1)
+    bits = low_freq > np.median(low_freq, axis=1, keepdims=True)
+    # Big-endian packing keeps the same bit order as imagehash's hex string
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+def get_phash_from_bytes(data):
+    """Compute 64-bit perceptual hash (as an int) from an image file's bytes"""
+    thumbnail = load_phash_thumbnail(data)
+    return None if thumbnail is None else int(phash_batch(thumbnail[None])[0])
+
 def get_phash(filepath):
     """Compute perceptual hash for visual duplicates"""
     try:
-        with Image.open(filepath) as img:
-            return imagehash.phash(img)
-    except:
+        with open(filepath, 'rb') as f:
+            return get_phash_from_bytes(f.read())
+    except OSError:
         return None
 
+def _hash_one(path, want_hash=True):
+    """Worker: return (path, exact hash, pHash thumbnail) for one image.
+
+    The file is read once and both inputs are computed from the same bytes;
+    files above FUSED_READ_LIMIT are hashed by streaming and their thumbnail
+    is decoded from the path, so they are never held in memory whole.
+    The pHash DCT itself is left to the driver so it can run in batches.
+    With want_hash=False (file size unique in the scan, so no exact duplicate
+    is possible) the exact hash is skipped and returned as None.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size > FUSED_READ_LIMIT:
+                return path, get_file_hash(path) if want_hash else None, load_phash_thumbnail_from_path(path)
+            data = f.read()
+    except OSError:
+        return path, None, None
+    if not want_hash:
+        return path, None, load_phash_thumbnail(data)
+    hasher = new_file_hasher()
+    hasher.update(data)
+    return path, hasher.hexdigest(), load_phash_thumbnail(data)
+
+def open_hash_cache(cache_path=HASH_CACHE):
+    """Open the persistent hash cache, creating its table if needed"""
+    conn = sqlite3.connect(cache_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS hashes (path TEXT PRIMARY KEY, size INTEGER, "
+                 "mtime INTEGER, file_hash TEXT, phash INTEGER, hash_algo TEXT)")
+    if "hash_algo" not in {row[1] for row in conn.execute("PRAGMA table_info(hashes)")}:
+        conn.execute("ALTER TABLE hashes ADD COLUMN hash_algo TEXT")  # older caches: digests count as stale
+    return conn
+
+def _phash_to_db(phash):
+    """SQLite integers are signed 64-bit, so store the pHash bit pattern as one"""
+    if phash is None: return None
+    return phash - (1 << 64) if phash >= 1 << 63 else phash
+
+def popcount64(values):
+    """Vectorized bit count for an array of uint64 values.
+
+    NumPy >= 2.0 ships np.bitwise_count, a ufunc backed by the CPU's
+    popcount instruction; older NumPy falls back to a SWAR bit count.
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    x = values - ((values >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+def _component_roots(n, rows, cols):
+    """Label each of n nodes with the lowest node index in its connected component"""
+    adjacency = csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n))
+    _, labels = connected_components(adjacency, directed=False)
+    _, first = np.unique(labels, return_index=True)
+    return first[labels]
+
+def _near_pairs(members, hashes, threshold):
+    """Return (rows, cols) edges of a spanning forest over member pairs within `threshold` bits.
+
+    Each row block is folded into the forest before the next one is compared, so
+    memory stays linear in len(members) even when all of them are near each other.
+    """
+    k = len(members)
+    sub = hashes[members]
+    rows_per_block = max(1, 4_000_000 // k)
+    roots = np.arange(k)
+    for start in range(0, k, rows_per_block):
+        dist = popcount64(sub[start:start + rows_per_block, None] ^ sub[None, :])
+        i, j = np.nonzero(dist <= threshold)
+        i += start
+        new = roots[i] != roots[j]  # pairs already connected add nothing
+        if new.any():
+            roots = _component_roots(k, np.r_[np.arange(k), i[new]], np.r_[roots, j[new]])
+    linked = np.flatnonzero(roots != np.arange(k))
+    return members[linked], members[roots[linked]]
+
+def find_similar_groups(files, hashes, threshold=SIMILARITY_THRESHOLD):
+    """Group files whose 64-bit pHashes are within `threshold` bits of each other.
+
+    Identical hashes are collapsed first, so a cluster of equal hashes (blank
+    frames, screenshots, bursts) is only compared once. The unique hashes use
+    multi-index hashing: the 64 bits are split into threshold + 1 ranges, and
+    by the pigeonhole principle any pair within `threshold` bits matches
+    exactly on at least one range. Only hashes sharing a bucket in some range
+    are compared, each bucket contributes a spanning forest rather than every
+    pair, and the forests are grouped with connected components.
+    """
+    n = len(files)
+    if n < 2:
+        return []
+    unique_hashes, inverse = np.unique(hashes, return_inverse=True)
+    m = len(unique_hashes)
+    bounds = np.linspace(0, 64, min(threshold, 63) + 2).astype(int)
+    rows, cols = [np.empty(0, dtype=np.intp)], [np.empty(0, dtype=np.intp)]
+    for lo, hi in tqdm(list(zip(bounds[:-1], bounds[1:])) if m > 1 else [], desc="Comparing hashes"):
+        keys = (unique_hashes >> np.uint64(lo)) & np.uint64((1 << (hi - lo)) - 1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], m]
+        for start, end in zip(starts, ends):
+            if end - start < 2: continue
+            bucket_rows, bucket_cols = _near_pairs(order[start:end], unique_hashes, threshold)
+            rows.append(bucket_rows)
+            cols.append(bucket_cols)
+    # A pair can show up once per matching range; duplicate edges are harmless
+    roots = _component_roots(m, np.concatenate(rows), np.concatenate(cols))
+    labels = roots[inverse.ravel()]
+
+    # Split file indices by component; groups follow first-member order
+    _, first, labels = np.unique(labels, return_index=True, return_inverse=True)
+    labels = np.argsort(np.argsort(first))[labels.ravel()]
+    sizes = np.bincount(labels)
+    members = np.split(np.argsort(labels, kind="stable"), np.cumsum(sizes)[:-1])
+    return [[files[i] for i in group] for group in members if len(group) > 1]
+
 def scan_images(folder):
-    """Return all images in folder (recursively)"""
-    images = []
-    for root, _, files in os.walk(folder):
-        for file in files:
-            if file.lower().endswith(IMAGE_EXTENSIONS):
-                images.append(os.path.join(root, file))
-    return images
+    """Yield all images in folder (recursively)"""
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from scan_images(entry.path)
+                elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in _IMG_EXT:
+                    yield entry.path
+    except OSError:
+        pass  # unreadable folder, skipped like os.walk does
 
 def get_best_date(path):
     """Return best available date: EXIF -> Filename -> Filesystem"""
-    # EXIF
-    try:
-        with Image.open(path) as img:
-            exif = img._getexif()
-            if exif:
-                for tag, value in exif.items():
-                    decoded = ExifTags.TAGS.get(tag, tag)
-                    if decoded == "DateTimeOriginal":
-                        return datetime.strptime(value, "%Y:%m:%d %H:%M:%S"), "EXIF"
-    except:
-        pass
+    # EXIF (skipped for formats that rarely carry it, e.g. PNG/GIF/BMP/WebP)
+    if os.path.splitext(path)[1].lower() in _EXIF_EXT:
+        try:
+            # Direct tag lookup in the Exif sub-IFD; no decoding of every tag into a dict
+            with Image.open(path) as img:
+                value = img.getexif().get_ifd(ExifTags.IFD.Exif).get(ExifTags.Base.DateTimeOriginal)
+            if value:
+                return datetime.strptime(value, "%Y:%m:%d %H:%M:%S"), "EXIF"
+        except:
+            pass
 
     # Filename patterns
     try:
         filename = os.path.basename(path)
-        match = re.search(r'(\d{4})(\d{2})(\d{2})', filename)
+        match = _DATE_RE.search(filename)
         if match:
             year, month, day = match.groups()
             return datetime(int(year), int(month), int(day)), "FILENAME"
@@ -94,18 +309,67 @@ def get_best_date(path):
         return None, "UNKNOWN"
 
 def blur_score(image_path):
-    """Return sharpness score for an image"""
+    """Return sharpness score for an image.
+
+    JPEGs are decoded at 1/4 scale straight to grayscale by libjpeg; the
+    Laplacian variance is only used for ranking, so full resolution is wasted.
+    """
     try:
-        img = cv2.imread(image_path)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        return cv2.Laplacian(gray, cv2.CV_64F).var()
+        gray = cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+        if gray is None: return 0
+        return cv2.Laplacian(gray, cv2.CV_32F).var()
     except:
         return 0
 
+@lru_cache(maxsize=4096)
+def _cached_best_date(path, mtime):
+    """get_best_date memoized on (path, mtime); an edited file gets a new entry"""
+    return get_best_date(path)
+
+def cached_best_date(path):
+    """get_best_date through the review cache, shared by GUI labels and moves"""
+    try:
+        return _cached_best_date(path, os.path.getmtime(path))
+    except OSError:
+        return get_best_date(path)
+
+def report_metadata(path):
+    """(best_date, best_date_source, sharpness) report columns for one visual-group member"""
+    date_obj, source = get_best_date(path)
+    return (f"{date_obj:%Y-%m-%d %H:%M:%S}" if date_obj else None), source, round(float(blur_score(path)), 1)
+
 def get_largest_file(files):
     """Return file with largest size"""
     return max(files, key=lambda f: os.path.getsize(f))
 
+def write_report(columns, report_path=DUPLICATE_REPORT):
+    """Write a dict of equal-length report columns to CSV"""
+    if pa:
+        pa.csv.write_csv(pa.table(columns), report_path)
+    else:
+        pd.DataFrame(columns).to_csv(report_path, index=False)
+
+def delete_files(paths, delete=os.remove, max_workers=8):
+    """Delete paths concurrently (the work is all syscalls); return how many succeeded"""
+    def _delete(path):
+        try:
+            delete(path)
+            return True
+        except Exception as e:
+            print(f"Delete failed: {path} ({e})")
+            return False
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return sum(executor.map(_delete, paths))
+
+def trash_files(paths):
+    """Send paths to the recycle bin in one send2trash call (one shell round-trip per batch)"""
+    if not paths:
+        return
+    try:
+        send2trash(list(paths))
+    except Exception as e:
+        print(f"Send to recycle bin failed: {e}")
+
 def get_valid_directory(prompt_text, existing_path=None, must_exist=True):
     """Validate user input directory or fallback"""
     if existing_path and os.path.isdir(os.path.abspath(existing_path)):
@@ -133,48 +397,95 @@ def get_valid_directory(prompt_text, existing_path=None, must_exist=True):
 def analyze(folder):
     """Detect exact and visual duplicates and save CSV report"""
     print("Scanning images...")
-    image_files = scan_images(folder)
+    image_files = list(scan_images(folder))
     print(f"Total images found: {len(image_files)}")
 
-    exact_hash_map = defaultdict(list)
-    phash_map = {}
-
-    for path in tqdm(image_files, desc="Hashing images"):
-        file_hash = get_file_hash(path)
-        if file_hash: exact_hash_map[file_hash].append(path)
-        phash = get_phash(path)
-        if phash: phash_map[path] = phash
+    stats = {}
+    for path in image_files:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stats[path] = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    # Size bucketing: only files sharing a size can be exact duplicates, so only those get a content hash
+    size_counts = Counter(size for _, size, _ in stats.values())
+
+    # Reuse hashes of files unchanged since the last run (file_hash is NULL for unique-size files);
+    # a digest made by a different hasher than the current one is treated as missing
+    file_hashes, phashes, to_hash, want_hash = {}, {}, [], []
+    cache = open_hash_cache()
+    cached = {row[0]: row[1:] for row in cache.execute(
+        "SELECT path, size, mtime, CASE WHEN hash_algo = ? THEN file_hash END, phash FROM hashes",
+        (FILE_HASH_ALGO,))}
+    for path, (key, size, mtime) in stats.items():
+        need_hash = size_counts[size] > 1
+        entry = cached.get(key)
+        if entry and entry[:2] == (size, mtime) and (entry[2] or not need_hash):
+            file_hashes[path] = entry[2]
+            if entry[3] is not None: phashes[path] = entry[3] & 0xFFFFFFFFFFFFFFFF
+        else:
+            to_hash.append(path)
+            want_hash.append(need_hash)
+    print(f"Cached: {len(image_files) - len(to_hash)} | To hash: {len(to_hash)}")
+
+    # Hash on every core; chunksize amortizes the inter-process overhead
+    thumb_paths, thumbnails = [], []
+    with ProcessPoolExecutor() as executor:
+        results = executor.map(_hash_one, to_hash, want_hash, chunksize=32)
+        for path, file_hash, thumbnail in tqdm(results, total=len(to_hash), desc="Hashing images"):
+            file_hashes[path] = file_hash
+            if thumbnail is not None:
+                thumb_paths.append(path)
+                thumbnails.append(thumbnail)
+
+    # pHash DCTs, one vectorized call per batch
+    for start in range(0, len(thumbnails), PHASH_BATCH_SIZE):
+        batch = np.stack(thumbnails[start:start + PHASH_BATCH_SIZE])
+        phashes.update(zip(thumb_paths[start:start + PHASH_BATCH_SIZE], phash_batch(batch).tolist()))
+
+    # Store the new hashes in a single transaction
+    with cache:
+        cache.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)", [
+            (*stats[path], file_hashes[path], _phash_to_db(phashes.get(path)), FILE_HASH_ALGO)
+            for path in to_hash if file_hashes[path] or path in phashes])
+    cache.close()
+
+    # Rebuild the maps in scan order so "first file" in a group stays stable
+    exact_hash_map = defaultdict(list)  # content hash -> paths (non-cryptographic is fine here)
+    phash_files = []  # parallel to the packed uint64 pHash array
+    for path in image_files:
+        if file_hashes.get(path): exact_hash_map[file_hashes[path]].append(path)
+        if path in phashes: phash_files.append(path)
 
     # Exact duplicates
     exact_duplicates = {h: paths for h, paths in exact_hash_map.items() if len(paths) > 1}
 
     # Visual duplicates
     print("Analyzing visual similarity...")
-    similar_groups = []
-    visited = set()
-    files = list(phash_map.keys())
-    for i in tqdm(range(len(files))):
-        if files[i] in visited: continue
-        group = [files[i]]
-        visited.add(files[i])
-        for j in range(i + 1, len(files)):
-            if files[j] in visited: continue
-            distance = phash_map[files[i]] - phash_map[files[j]]
-            if distance <= SIMILARITY_THRESHOLD:
-                group.append(files[j])
-                visited.add(files[j])
-        if len(group) > 1: similar_groups.append(group)
-
-    # Write CSV
-    rows = []
+    hashes = np.fromiter((phashes[path] for path in phash_files), dtype=np.uint64, count=len(phash_files))
+    similar_groups = find_similar_groups(phash_files, hashes)
+
+    # Dates + sharpness for visual-group members, so review does no per-file EXIF/blur work
+    visual_files = [path for group in similar_groups for path in group]
+    with ThreadPoolExecutor() as executor:
+        metadata = dict(zip(visual_files, executor.map(report_metadata, visual_files)))
+
+    # Write CSV (columns collected directly, no per-row dicts)
+    types, group_ids, file_paths = [], [], []
+    best_dates, date_sources, sharpness = [], [], []
     for h, files_list in exact_duplicates.items():
-        for f in files_list:
-            rows.append({"type":"exact_duplicate","group_id":h,"file_path":f})
+        types += ["exact_duplicate"] * len(files_list)
+        group_ids += [h] * len(files_list)
+        file_paths += files_list
+        for column in (best_dates, date_sources, sharpness): column += [None] * len(files_list)
     for idx, group in enumerate(similar_groups):
-        for f in group:
-            rows.append({"type":"visual_duplicate","group_id":f"visual_group_{idx}","file_path":f})
-    df = pd.DataFrame(rows)
-    df.to_csv(DUPLICATE_REPORT, index=False)
+        types += ["visual_duplicate"] * len(group)
+        group_ids += [f"visual_group_{idx}"] * len(group)
+        file_paths += group
+        dates, sources, scores = zip(*(metadata[path] for path in group))
+        best_dates += dates; date_sources += sources; sharpness += scores
+    write_report({"type": types, "group_id": group_ids, "file_path": file_paths,
+                  "best_date": best_dates, "best_date_source": date_sources, "sharpness": sharpness})
 
     print("\n===================================")
     print(f"Exact duplicate groups: {len(exact_duplicates)}")
@@ -190,29 +501,32 @@ def clean_exact_duplicates():
     if not os.path.exists(DUPLICATE_REPORT):
         print("Duplicate report not found. Run 'duplicate_detector' first.")
         return
-    df = pd.read_csv(DUPLICATE_REPORT)
+    df = pd.read_csv(DUPLICATE_REPORT, usecols=list(REPORT_DTYPES), dtype=REPORT_DTYPES)
     if df.empty:
         print("No duplicates found in report.")
         return
 
     exact_df = df[df["type"]=="exact_duplicate"]
-    grouped = exact_df.groupby("group_id")
+    # One vectorized pass: the first row of each group is kept, the rest deleted
+    is_extra = exact_df.duplicated("group_id", keep="first")
     total_deleted = 0
 
-    for group_id, group in grouped:
-        files = group["file_path"].tolist()
-        keep_file = files[0]
-        delete_files = files[1:]
-        print(f"\nGroup: {group_id}")
-        print(f"Keeping: {keep_file}")
-        for f in delete_files:
-            if os.path.exists(f):
-                print(f"Deleting: {f}")
-                if not DRY_RUN:
-                    os.remove(f)
-                    total_deleted += 1
-            else:
-                print(f"File not found: {f}")
+    print(f"Exact duplicate groups: {(~is_extra).sum()}")
+    for f in exact_df.loc[~is_extra, "file_path"]:
+        print(f"Keeping: {f}")
+    # Stat every candidate once, in parallel, instead of per file in the loop
+    extras = exact_df.loc[is_extra, "file_path"].tolist()
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        alive = {f for f, ok in zip(extras, executor.map(os.path.lexists, extras)) if ok}
+    to_delete = []
+    for f in extras:
+        if f in alive:
+            print(f"Deleting: {f}")
+            to_delete.append(f)
+        else:
+            print(f"File not found: {f}")
+    if not DRY_RUN:
+        total_deleted = delete_files(to_delete)
 
     print("\n=================================")
     if DRY_RUN:
@@ -224,6 +538,20 @@ def clean_exact_duplicates():
 # =====================================================
 # ==================== REVIEW VISUAL DUPLICATES ======
 # =====================================================
+_name_counters = {}  # (folder, filename) -> next "_N" suffix to try
+
+def _unique_destination(folder, filename):
+    """Free path for filename in folder; the "_N" search resumes where the previous one stopped"""
+    destination = os.path.join(folder, filename)
+    if not os.path.exists(destination):
+        return destination
+    name, ext = os.path.splitext(filename)
+    counter = _name_counters.get((folder, filename), 1)
+    while os.path.exists(destination := os.path.join(folder, f"{name}_{counter}{ext}")):
+        counter += 1
+    _name_counters[(folder, filename)] = counter + 1
+    return destination
+
 def move_to_folder(file_path, base_folder=OUTPUT_SORTED):
     """Move file to folder based on best date.
 
@@ -240,17 +568,11 @@ def move_to_folder(file_path, base_folder=OUTPUT_SORTED):
         print(f"Skipping move; '{file_path}' is already inside '{base_folder}'")
         return False
 
-    date_obj, source = get_best_date(file_path)
+    date_obj, source = cached_best_date(file_path)
     target_folder = os.path.join(base_folder, "Unknown" if not date_obj else f"{date_obj:%Y}/{date_obj:%m}")
     os.makedirs(target_folder, exist_ok=True)
 
-    filename = os.path.basename(file_path)
-    destination = os.path.join(target_folder, filename)
-    counter = 1
-    while os.path.exists(destination):
-        name, ext = os.path.splitext(filename)
-        destination = os.path.join(target_folder, f"{name}_{counter}{ext}")
-        counter += 1
+    destination = _unique_destination(target_folder, os.path.basename(file_path))
 
     try:
         shutil.move(file_path, destination)
@@ -260,6 +582,109 @@ def move_to_folder(file_path, base_folder=OUTPUT_SORTED):
         print("Move failed:", e)
         return False
 
+def check_jpeg_decoder():
+    """Warn if Pillow lacks libjpeg-turbo; called from review, not at import (pool workers re-import)"""
+    try:
+        from PIL import features
+        if features.check_feature("libjpeg_turbo"):
+            return True
+    except Exception:
+        pass
+    print("⚠️ Pillow is not built with libjpeg-turbo; thumbnail decoding will be slower.\n"
+          "   Install a turbo-linked build, e.g. `pip install pillow-simd` (drop-in for Pillow).")
+    return False
+
+def _thumb_cache_path(fpath, size=THUMBNAIL_SIZE):
+    """Cache file for fpath's preview; a new mtime (edited file) maps to a new entry"""
+    key = f"{fpath}|{os.path.getmtime(fpath)}|{size[0]}"
+    return os.path.join(THUMBNAIL_CACHE_DIR, hashlib.sha1(key.encode()).hexdigest() + ".webp")
+
+def load_thumbnail(fpath, size=THUMBNAIL_SIZE):
+    """Return a thumbnail-sized PIL image (safe off the Tk thread), via the disk cache"""
+    cache_path = _thumb_cache_path(fpath, size)
+    if os.path.exists(cache_path):
+        try:
+            img = Image.open(cache_path)
+            img.load()  # single-frame load closes the file
+            return img
+        except Exception:
+            pass  # unreadable cache entry: decode again and overwrite it
+    with Image.open(fpath) as img:
+        img.draft("RGB", size)  # JPEG: let libjpeg decode at 1/2..1/8 scale
+        img.thumbnail(size)
+        thumb = img.copy()      # copy of the small image only; close() drops the pixels
+    try:
+        thumb.save(cache_path, "WEBP", quality=80)
+    except Exception:
+        pass  # caching is best-effort (e.g. modes WebP can't store)
+    return thumb
+
+def _thumbnail_or_error(fpath):
+    try:
+        return load_thumbnail(fpath)
+    except Exception as e:
+        return e
+
+def _prefetch_groups(groups, out_queue):
+    """Background thread: decode thumbnails for upcoming review groups.
+
+    Puts (index, group_id, files, thumbnails) on out_queue, where a failed
+    decode is stored as its exception, then None once all groups are done.
+    Only PIL work happens here; PhotoImage must be built on the Tk thread.
+    """
+    for idx, (group_id, files) in enumerate(groups, start=1):
+        # libjpeg releases the GIL, so a group's decodes overlap on a thread pool
+        with ThreadPoolExecutor(max_workers=min(8, len(files))) as executor:
+            thumbnails = list(executor.map(_thumbnail_or_error, files))
+        out_queue.put((idx, group_id, files, thumbnails))
+    out_queue.put(None)
+
+def _inode(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+def _inode_batch(paths, max_workers=32):
+    """{path: (st_dev, st_ino)} for the paths that exist, stat'ed concurrently (stat releases the GIL)"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return {p: ino for p, ino in zip(paths, executor.map(_inode, paths)) if ino is not None}
+
+def _split_groups(group_ids, file_paths):
+    """[(group_id, [paths])] in first-appearance order: one stable sort + boundary slices, no groupby"""
+    codes, uniques = pd.factorize(np.asarray(group_ids, dtype=object))
+    if len(codes) == 0:
+        return []
+    order = np.argsort(codes, kind="mergesort")
+    codes, paths = codes[order], np.asarray(file_paths, dtype=object)[order]
+    bounds = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1], True])
+    return [(uniques[codes[start]], paths[start:end].tolist()) for start, end in zip(bounds[:-1], bounds[1:])]
+
+def read_visual_rows(report_path=DUPLICATE_REPORT):
+    """Columns of the report's visual_duplicate rows as lists (pyarrow's threaded parser when available).
+
+    The REPORT_META_DTYPES columns come back as all-None lists for reports
+    written before they existed, and per row where a value is missing.
+    """
+    wanted = ["group_id", "file_path", *REPORT_META_DTYPES]
+    if pa is not None:
+        table = pa.csv.read_csv(report_path, convert_options=pa.csv.ConvertOptions(
+            include_columns=[*REPORT_DTYPES, *REPORT_META_DTYPES], include_missing_columns=True,
+            column_types={**{c: pa.string() for c in REPORT_DTYPES}, "best_date": pa.string(),
+                          "best_date_source": pa.string(), "sharpness": pa.float64()}))
+        table = table.filter(pa.compute.equal(table["type"], "visual_duplicate"))
+        return {c: table[c].to_pylist() for c in wanted}
+    df = pd.read_csv(report_path, usecols=lambda c: c in REPORT_DTYPES or c in REPORT_META_DTYPES,
+                     dtype={**REPORT_DTYPES, **REPORT_META_DTYPES})
+    visual_df = df[df["type"]=="visual_duplicate"]
+    return {c: visual_df[c].astype(object).where(visual_df[c].notna(), None).tolist() if c in visual_df
+            else [None] * len(visual_df) for c in wanted}
+
+def _with_copies(files, copies):
+    """files plus the hardlinked copies collapsed into them for display"""
+    return [p for f in files for p in (f, *copies.get(f, ()))]
+
 def review_visual_duplicates():
     """GUI review for visual duplicates.
 
@@ -270,18 +695,35 @@ def review_visual_duplicates():
     if not os.path.exists(DUPLICATE_REPORT):
         print("Duplicate report not found. Run 'duplicate_detector' first.")
         return
-    df = pd.read_csv(DUPLICATE_REPORT)
-    if df.empty:
-        print("No duplicates found in report.")
+    check_jpeg_decoder()
+    os.makedirs(THUMBNAIL_CACHE_DIR, exist_ok=True)
+    rows = read_visual_rows()
+    if not rows["file_path"]:
+        print("No visual duplicates found in report.")
         return
-    visual_df = df[df["type"]=="visual_duplicate"]
-    grouped = list(visual_df.groupby("group_id"))
+    # One batched stat up front: missing files are dropped, hardlinks (same dev+inode) are shown
+    # once under their first path (copies[path] lists the other links so actions still reach
+    # them), and groups left with <2 distinct files are skipped
+    inodes = _inode_batch(rows["file_path"])
+    copies = {}
+    report_dates = {f: d for f, d in zip(rows["file_path"], rows["best_date"]) if d}  # precomputed by analyze
+    grouped = []
+    for group_id, files in _split_groups(rows["group_id"], rows["file_path"]):
+        unique = {}
+        for f in files:
+            if f not in inodes: continue
+            kept = unique.setdefault(inodes[f], f)
+            if kept != f: copies.setdefault(kept, []).append(f)
+        if len(unique) >= 2:  # links to one file leave nothing to compare
+            grouped.append((group_id, list(unique.values())))
     total_groups = len(grouped)
 
-    for idx, (group_id, group) in enumerate(grouped, start=1):
-        files = [f for f in group["file_path"].tolist() if os.path.exists(f)]
-        if len(files) < 2:
-            continue
+    # Decode the next groups' thumbnails while the current one is reviewed
+    prefetched = queue.Queue(maxsize=PREFETCH_GROUPS)
+    threading.Thread(target=_prefetch_groups, args=(grouped, prefetched), daemon=True).start()
+
+    while (item := prefetched.get()) is not None:
+        idx, group_id, files, thumbnails = item
         selected_action = {"choice": None}
         selected_indices = set()
         frames = {}
@@ -324,21 +766,26 @@ def review_visual_duplicates():
 
         images = []
         columns = 3
-        for i, fpath in enumerate(files):
+        for i, (fpath, thumbnail) in enumerate(zip(files, thumbnails)):
+            if isinstance(thumbnail, Exception):
+                print("Cannot open:", fpath, "error:", thumbnail)
+                continue
             try:
-                with Image.open(fpath) as img:
-                    img_copy = img.copy()
-                img_copy.thumbnail((600,600))
-                photo = ImageTk.PhotoImage(img_copy)
+                photo = ImageTk.PhotoImage(thumbnail)
                 images.append(photo)
+                thumbnails[i] = None  # Tk keeps its own copy of the pixels
                 frame = tk.Frame(scroll_frame, bd=2, relief="groove")
                 frames[i] = frame
                 frame.grid(row=i//columns, column=i%columns, padx=10, pady=10)
                 tk.Label(frame,image=photo).pack()
                 tk.Label(frame,text=f"Index: {i}",font=("Arial",14,"bold")).pack()
                 tk.Label(frame,text=fpath,wraplength=500).pack()
-                date_obj, source = get_best_date(fpath)
-                tk.Label(frame,text=f"Date: {date_obj:%Y-%m-%d}" if date_obj else "Date: Unknown",fg="blue").pack()
+                if fpath in report_dates:
+                    date_text = report_dates[fpath][:10]
+                else:
+                    date_obj, source = cached_best_date(fpath)
+                    date_text = f"{date_obj:%Y-%m-%d}" if date_obj else "Unknown"
+                tk.Label(frame,text=f"Date: {date_text}",fg="blue").pack()
                 # checkbox for multi-selection
                 var = tk.BooleanVar()
                 chk = tk.Checkbutton(frame, text="Select", variable=var,
@@ -395,48 +842,59 @@ def review_visual_duplicates():
         if not action: continue
         action_type, value = action
         print(f"Action: {action_type}, selected indices: {sorted(selected_indices)}")
+        # Trashing or skipping a file covers its hardlinked copies; keeping one moves only
+        # the shown path and trashes its extra links, as when they were listed separately
         if action_type == "delete_all":
-            for f in files:
+            to_trash = _with_copies(files, copies)
+            for f in to_trash:
                 print("Deleting (all):", f)
-                send2trash(f)
+            trash_files(to_trash)
         elif action_type == "skip":
-            for f in files:
+            for f in _with_copies(files, copies):
                 print("Skipping (keeping in place):", f)
                 move_to_folder(f)  # move_to_folder will skip already-sorted
         elif action_type == "keep_best":
             keep_file = get_largest_file(files)
             print("Keeping best (moving):", keep_file)
             move_to_folder(keep_file)
-            for f in files:
-                if f != keep_file:
-                    print("Deleting:", f)
-                    send2trash(f)
+            to_trash = copies.get(keep_file, []) + _with_copies([f for f in files if f != keep_file], copies)
+            for f in to_trash:
+                print("Deleting:", f)
+            trash_files(to_trash)
         elif action_type == "keep_index":
             keep_file = files[value]
             print("Keeping index", value, keep_file)
             move_to_folder(keep_file)
-            for i, f in enumerate(files):
-                if i != value:
-                    print("Deleting:", f)
-                    send2trash(f)
+            to_trash = copies.get(keep_file, []) + _with_copies([f for i, f in enumerate(files) if i != value], copies)
+            for f in to_trash:
+                print("Deleting:", f)
+            trash_files(to_trash)
         elif action_type == "keep_selected":
             # move/keep the checked indices and trash the rest
+            to_trash = []
             for i, f in enumerate(files):
                 if i in selected_indices:
                     print("Keeping selected (moving):", f)
                     move_to_folder(f)
+                    to_trash.extend(copies.get(f, []))
                 else:
-                    print("Deleting:", f)
-                    send2trash(f)
+                    for c in _with_copies([f], copies):
+                        print("Deleting:", c)
+                        to_trash.append(c)
+            trash_files(to_trash)
         elif action_type == "delete_selected":
             # trash checked files and move the others
+            to_trash = []
             for i, f in enumerate(files):
                 if i in selected_indices:
-                    print("Deleting selected:", f)
-                    send2trash(f)
+                    for c in _with_copies([f], copies):
+                        print("Deleting selected:", c)
+                        to_trash.append(c)
                 else:
                     print("Keeping (moving):", f)
                     move_to_folder(f)
+                    to_trash.extend(copies.get(f, []))
+            trash_files(to_trash)
 
     print("Done reviewing.")
 
@@ -451,31 +909,21 @@ def get_best_date_sorting(path, is_image=True):
     3. Filesystem timestamps
     """
 
-    # 1️⃣ Try EXIF (images only)
-    if is_image:
+    # 1️⃣ Try EXIF (images in formats that carry it only)
+    if is_image and os.path.splitext(path)[1].lower() in _EXIF_EXT:
         try:
+            # Direct tag lookup in the Exif sub-IFD; no decoding of every tag into a dict
             with Image.open(path) as img:
-                exif = img._getexif()
-                if exif:
-                    for tag, value in exif.items():
-                        decoded = ExifTags.TAGS.get(tag, tag)
-                        if decoded == "DateTimeOriginal":
-                            return datetime.strptime(value, "%Y:%m:%d %H:%M:%S"), "EXIF"
+                value = img.getexif().get_ifd(ExifTags.IFD.Exif).get(ExifTags.Base.DateTimeOriginal)
+            if value:
+                return datetime.strptime(value, "%Y:%m:%d %H:%M:%S"), "EXIF"
         except:
             pass
 
     filename = os.path.basename(path)
 
-    patterns = [
-        r'IMG[-_]?(\d{4})(\d{2})(\d{2})',             # IMG-YYYYMMDD or IMG_YYYYMMDD or IMGYYYYMMDD
-        r'VID[-_]?(\d{4})(\d{2})(\d{2})',             # VID-YYYYMMDD, VID_YYYYMMDD, VIDYYYYMMDD
-        r'SAVE[-_]?(\d{4})(\d{2})(\d{2})',            # SAVE_YYYYMMDD
-        r'Screenshot[-_]?(\d{4})[-_](\d{2})[-_](\d{2})',  # Screenshot_YYYY-MM-DD or -YYYY-MM-DD-
-        r'(\d{4})(\d{2})(\d{2})',                      # YYYYMMDD at beginning
-    ]
-
-    for pat in patterns:
-        match = re.search(pat, filename)
+    for pat in _SORT_DATE_PATTERNS:
+        match = pat.search(filename)
         if match:
             try:
                 year, month, day = match.groups()
@@ -494,34 +942,77 @@ def get_best_date_sorting(path, is_image=True):
 
     return None, "UNKNOWN"
 
+_folder_locks = {}                 # target folder -> Lock (sort workers share folders)
+_folder_locks_guard = threading.Lock()
+
+def _folder_lock(folder):
+    with _folder_locks_guard:
+        return _folder_locks.setdefault(folder, threading.Lock())
+
+_log_buffer = []
+_log_lock = threading.Lock()
+
+def flush_log():
+    """Write all buffered sort log lines in a single stdout call"""
+    with _log_lock:
+        lines = _log_buffer[:]
+        _log_buffer.clear()
+    if lines: sys.stdout.write("\n".join(lines) + "\n")
+
+def _log(message):
+    """Buffer a log line from a sort worker; flushed every LOG_FLUSH_LINES lines"""
+    with _log_lock:
+        _log_buffer.append(message)
+        full = len(_log_buffer) >= LOG_FLUSH_LINES
+    if full: flush_log()
+
 def move_to_sorted_folder(file_path, output_base, is_image=True):
     date_obj, source = get_best_date_sorting(file_path,is_image)
     target_folder = os.path.join(output_base,"Unknown" if not date_obj else f"{date_obj:%Y}/{date_obj:%m}")
-    os.makedirs(target_folder,exist_ok=True)
     filename = os.path.basename(file_path)
-    destination = os.path.join(target_folder,filename)
-    counter=1
-    while os.path.exists(destination):
-        name,ext=os.path.splitext(filename)
-        destination=os.path.join(target_folder,f"{name}_{counter}{ext}")
-        counter+=1
-    try: shutil.move(file_path,destination); print(f"Moved → {destination} | Source: {source}")
-    except Exception as e: print(f"Failed to move {file_path}: {e}")
+    # Name selection and the move must be atomic per folder, or two workers can pick the same suffix
+    with _folder_lock(target_folder):
+        os.makedirs(target_folder,exist_ok=True)
+        destination = _unique_destination(target_folder,filename)
+        try:
+            shutil.move(file_path,destination)
+            if VERBOSE: _log(f"Moved → {destination} | Source: {source}")
+        except Exception as e: _log(f"Failed to move {file_path}: {e}")
+
+def _iter_media(folder, output_sorted_abs):
+    """Yield (path, is_image) for every image/video under folder, pruning the output folder"""
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path != output_sorted_abs:  # folder is absolute, so entry.path is too
+                        yield from _iter_media(entry.path, output_sorted_abs)
+                    continue
+                ext = os.path.splitext(entry.name)[1].lower()
+                if ext in _IMG_EXT: yield entry.path, True
+                elif ext in _VIDEO_EXT: yield entry.path, False
+    except OSError:
+        pass  # unreadable folder, skipped like os.walk does
+
+def _sort_one(path, is_image):
+    move_to_sorted_folder(path,OUTPUT_SORTED,is_image)
+    return is_image
 
 def sort_all_media(source_folder):
-    """Sort all images/videos by date"""
+    """Sort all images/videos by date (EXIF reads and moves run on a thread pool)"""
     total_images=total_videos=0
     source_folder=os.path.abspath(source_folder)
     output_sorted_abs=os.path.abspath(OUTPUT_SORTED)
-    for root,_,files in os.walk(source_folder,topdown=True):
-        if os.path.abspath(root).startswith(output_sorted_abs): continue
-        for file in files:
-            full_path=os.path.join(root,file)
-            lower_file=file.lower()
-            if lower_file.endswith(IMAGE_EXTENSIONS):
-                total_images+=1; move_to_sorted_folder(full_path,OUTPUT_SORTED,True)
-            elif lower_file.endswith(VIDEO_EXTENSIONS):
-                total_videos+=1; move_to_sorted_folder(full_path,OUTPUT_SORTED,False)
+    if source_folder==output_sorted_abs or source_folder.startswith(output_sorted_abs+os.sep):
+        print("Source folder is inside the sorted output; nothing to do."); return
+    try:
+        with ThreadPoolExecutor(max_workers=(os.cpu_count() or 1)*2) as executor:
+            futures=[executor.submit(_sort_one,path,is_image) for path,is_image in _iter_media(source_folder,output_sorted_abs)]
+            for future in as_completed(futures):
+                if future.result(): total_images+=1
+                else: total_videos+=1
+    finally:
+        flush_log()  # buffered "Moved →" lines survive an error or Ctrl+C
     print("\n==============================")
     print(f"Total images processed: {total_images}")
     print(f"Total videos processed: {total_videos}")
@@ -555,7 +1046,7 @@ def processphotogallery():
 # ==================== CLI ENTRY POINT ==============
 # =====================================================
 def processphotogallery_cli():
-    global DRY_RUN
+    global DRY_RUN, VERBOSE
     global OUTPUT_SORTED   # Declare global BEFORE using it
 
     parser = argparse.ArgumentParser(description="Photo gallery processor")
@@ -568,10 +1059,12 @@ def processphotogallery_cli():
     parser.add_argument("--sourcepath","-s",type=str,default=None,help="Source folder")
     parser.add_argument("--output","-o",type=str,default=OUTPUT_SORTED,help="Output folder for sorted files")
     parser.add_argument("--dryrun",action="store_true",help="Enable dry run mode")
+    parser.add_argument("--quiet","-q",action="store_true",help="Don't print a line per sorted file")
 
     args = parser.parse_args()
 
     DRY_RUN = args.dryrun
+    VERBOSE = not args.quiet
     OUTPUT_SORTED = args.output   # Now safe to assign
 
     if not args.mode: